@@ -3,9 +3,14 @@ from __future__ import annotations
 import logging
 import math
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
 
 from binance.client import Client
+from requests.adapters import HTTPAdapter
+
+from .binance_ws_api import BinanceWsApiClient, BinanceWsApiUnavailable
 from binance.exceptions import BinanceAPIException, BinanceRequestException
 from decimal import Decimal, ROUND_DOWN, getcontext
 
@@ -14,57 +19,109 @@ log = logging.getLogger("binance_futures")
 getcontext().prec = 28
 
 
+@dataclass(frozen=True)
+class _TickSpec:
+    dec: Decimal   # tickSize，例如 0.001
+    scale: int     # 10 ** digits，例如 1000
+    units: int     # tickSize * scale，例如 1（tick=0.5 => 5）
+    digits: int    # 小数位数，例如 3
+
+
 class BinanceFuturesTrader:
-    def __init__(self, api_key: str, api_secret: str, testnet: bool, recv_window: int) -> None:
+    def __init__(self, api_key: str, api_secret: str, testnet: bool, recv_window: int, ws_api: bool = False) -> None:
         self.client = Client(api_key, api_secret, testnet=testnet)
         self.client.FUTURES_URL = self.client.FUTURES_TESTNET_URL if testnet else self.client.FUTURES_URL
         self.recv_window = recv_window
+        # 所有签名请求统一带 recvWindow（python-binance 在签名时注入），调用处不用再逐个传
+        self.client.REQUEST_RECVWINDOW = recv_window
+
+        # 默认连接池只有 10 个连接，并发下单/挂 TP/SL 时会 "Connection pool is full" 后重新握手。
+        # urllib3 默认已开启 TCP_NODELAY，这里只放大连接池。
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0)
+        self.client.session.mount("https://", adapter)
 
-        self._exchange_info: Optional[Dict[str, Any]] = None
         self._exchange_info_ts = 0.0
         self._exchange_info_ttl = 600.0
+        # symbol -> {step, min_qty, tick}，刷新 exchangeInfo 时一次性构建；
+        # 只保留 USDT 计价且 TRADING 的合约，原始 exchangeInfo（>1MB）不常驻内存
+        self._symbol_index: Dict[str, Dict[str, Any]] = {}
+
+        # symbol -> (markPrice, monotonic ts)；连续事件复用，省掉一次 HTTP 往返
+        self._mark_cache: Dict[str, Tuple[float, float]] = {}
+        self._mark_ttl = 0.5
+
+        # 已生效的保证金模式 / 杠杆，未变化时跳过对应请求
+        self._applied_margin: Dict[str, str] = {}
+        self._applied_lev: Dict[str, int] = {}
+
+        # 互不依赖的前置请求并发发出（python-binance 是同步客户端，用线程池）
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="binance")
+
+        # 下单走 WebSocket API 长连接（连接不可用时回退 REST）；connect() 在后台线程建连/重连，不阻塞
+        self._ws_api: Optional[BinanceWsApiClient] = None
+        if ws_api:
+            self._ws_api = BinanceWsApiClient(api_key, api_secret, testnet=testnet, recv_window=recv_window)
+            self._ws_api.connect()
 
     def _refresh_exchange_info_if_needed(self) -> None:
         now = time.monotonic()
-        if self._exchange_info and (now - self._exchange_info_ts) < self._exchange_info_ttl:
+        if self._symbol_index and (now - self._exchange_info_ts) < self._exchange_info_ttl:
             return
-        self._exchange_info = self.client.futures_exchange_info()
-        self._exchange_info_ts = time.monotonic()
+        self._symbol_index = self._build_symbol_index(self.client.futures_exchange_info())
+        self._exchange_info_ts = now
+
+    @staticmethod
+    def _build_symbol_index(exchange_info: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        把 exchangeInfo 的 symbols 列表按 symbol 建索引，并预先解析 LOT_SIZE / PRICE_FILTER。
+        只保留可交易的 USDT 合约（策略只会交易 {symbol}USDT）。
+        """
+        index: Dict[str, Dict[str, Any]] = {}
+        for s in exchange_info.get("symbols", []):
+            symbol = s.get("symbol")
+            if not symbol or s.get("status") != "TRADING" or s.get("quoteAsset") != "USDT":
+                continue
+            entry: Dict[str, Any] = {"step": None, "min_qty": None, "tick": None}
+            for f in s.get("filters", []):
+                ft = f.get("filterType")
+                if ft == "LOT_SIZE":
+                    try:
+                        entry["step"] = float(f.get("stepSize"))
+                        entry["min_qty"] = float(f.get("minQty"))
+                    except Exception:
+                        pass
+                elif ft == "PRICE_FILTER":
+                    try:
+                        entry["tick"] = BinanceFuturesTrader._parse_tick(f.get("tickSize"))
+                    except Exception:
+                        pass
+            index[symbol] = entry
+        return index
 
     def futures_symbol_exists(self, symbol: str) -> bool:
         try:
             self._refresh_exchange_info_if_needed()
-            assert self._exchange_info is not None
-            for s in self._exchange_info.get("symbols", []):
-                if s.get("symbol") == symbol and s.get("status") == "TRADING":
-                    return True
-            return False
+            return symbol in self._symbol_index
         except Exception as e:
             log.warning("futures_symbol_exists error: %s", e, exc_info=True)
             return False
 
     def _get_filters(self, symbol: str) -> Tuple[Optional[float], Optional[float]]:
         self._refresh_exchange_info_if_needed()
-        assert self._exchange_info is not None
-        for s in self._exchange_info.get("symbols", []):
-            if s.get("symbol") != symbol:
-                continue
-            step = None
-            min_qty = None
-            for f in s.get("filters", []):
-                if f.get("filterType") == "LOT_SIZE":
-                    try:
-                        step = float(f.get("stepSize"))
-                        min_qty = float(f.get("minQty"))
-                    except Exception:
-                        pass
-            return step, min_qty
-        return None, None
+        entry = self._symbol_index.get(symbol)
+        if entry is None:
+            return None, None
+        return entry["step"], entry["min_qty"]
 
     def get_mark_price(self, symbol: str) -> Optional[float]:
+        cached = self._mark_cache.get(symbol)
+        if cached and (time.monotonic() - cached[1]) < self._mark_ttl:
+            return cached[0]
         try:
             mp = self.client.futures_mark_price(symbol=symbol)
-            return float(mp["markPrice"])
+            price = float(mp["markPrice"])
+            self._mark_cache[symbol] = (price, time.monotonic())
+            return price
         except Exception as e:
             log.warning("get_mark_price error: %s", e, exc_info=True)
             return None
@@ -75,14 +132,46 @@ class BinanceFuturesTrader:
             return qty
         return math.floor(qty / step) * step
 
+    def _ensure_margin_type(self, symbol: str, margin_type: str) -> None:
+        if self._applied_margin.get(symbol) == margin_type:
+            return
+        try:
+            self.client.futures_change_margin_type(symbol=symbol, marginType=margin_type)
+            self._applied_margin[symbol] = margin_type
+        except BinanceAPIException as e:
+            # -4046: No need to change margin type（已经是目标模式）
+            if getattr(e, "code", None) == -4046:
+                self._applied_margin[symbol] = margin_type
+            log.info("change_margin_type: %s", getattr(e, "message", str(e)))
+        except Exception as e:
+            log.info("change_margin_type err: %s", e)
+
+    def _ensure_leverage(self, symbol: str, leverage: int) -> None:
+        if self._applied_lev.get(symbol) == leverage:
+            return
+        try:
+            self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
+            self._applied_lev[symbol] = leverage
+        except Exception as e:
+            log.info("change_leverage err: %s", e)
+
     def open_short_market(self, symbol: str, notional_usdt: float, leverage: int, margin_type: str) -> Optional[Dict[str, Any]]:
         try:
+            # margin/leverage 与 mark price 互不依赖：前两者丢线程池，mark price 在当前线程取，
+            # 总耗时从 3 个 RTT 变成 max(RTT)。_ensure_* 内部吞异常，不会互相影响。
+            prep = [
+                self._pool.submit(self._ensure_margin_type, symbol, margin_type),
+                self._pool.submit(self._ensure_leverage, symbol, leverage),
+            ]
             price = self.get_mark_price(symbol)
+            step, min_qty = self._get_filters(symbol)
+            # 下单前必须等保证金模式/杠杆生效
+            wait(prep)
+
             if not price or price <= 0:
                 log.warning("mark price unavailable, skip trade: %s", symbol)
                 return None
 
-            step, min_qty = self._get_filters(symbol)
             qty = notional_usdt / price
 
             if step:
@@ -92,25 +181,12 @@ class BinanceFuturesTrader:
                 log.warning("qty < minQty, skip. symbol=%s qty=%s min=%s", symbol, qty, min_qty)
                 return None
 
-            try:
-                self.client.futures_change_margin_type(symbol=symbol, marginType=margin_type, recvWindow=self.recv_window)
-            except BinanceAPIException as e:
-                log.info("change_margin_type: %s", getattr(e, "message", str(e)))
-            except Exception as e:
-                log.info("change_margin_type err: %s", e)
-
-            try:
-                self.client.futures_change_leverage(symbol=symbol, leverage=leverage, recvWindow=self.recv_window)
-            except Exception as e:
-                log.info("change_leverage err: %s", e)
-
-            order = self.client.futures_create_order(
+            order = self._create_order(
                 symbol=symbol,
                 side="SELL",
                 type="MARKET",
                 quantity=qty,
                 positionSide="SHORT",
-                recvWindow=self.recv_window,
             )
             return order
 
@@ -121,51 +197,93 @@ class BinanceFuturesTrader:
             log.error("open_short_market error: %s", e, exc_info=True)
             return None
 
+    def _ws_api_request(self, method: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        走 WebSocket API 发请求；返回 None 表示请求没发出去（未启用 / 连接不可用），调用方回退 REST。
+        已发出但被拒绝 / 超时的请求直接抛异常，不回退，避免重复下单。
+        """
+        if self._ws_api is None:
+            return None
+        try:
+            return self._ws_api.request(method, params)
+        except BinanceWsApiUnavailable as e:
+            log.info("ws api unavailable, fallback to REST: %s", e)
+            return None
+
+    def _create_order(self, **params):
+        res = self._ws_api_request("order.place", params)
+        if res is not None:
+            return res
+        return self.client.futures_create_order(**params)
+
     def _futures_algo_order(self, **params):
         """
         Binance USD-M Futures: New Algo Order endpoint
-        POST /fapi/v1/algoOrder (signed)
+        POST /fapi/v1/algoOrder (signed) / WS API algoOrder.place
 
         python-binance 目前多数版本还没封装该接口，所以用底层 _request_futures_api 直调。
         """
+        res = self._ws_api_request("algoOrder.place", params)
+        if res is not None:
+            return res
         return self.client._request_futures_api("post", "algoOrder", True, data=params)
 
 
-    def _get_tick_size(self, symbol: str) -> Optional[float]:
+    @staticmethod
+    def _parse_tick(tick_str: Any) -> Optional[_TickSpec]:
+        """
+        直接从 exchangeInfo 原始字符串构建 Decimal（不经过 float），并去掉尾随 0（"0.00100" => 0.001），
+        同时预先算好整数舍入需要的 scale/units/digits。
+        """
+        t = Decimal(str(tick_str)).normalize()
+        if t <= 0:
+            return None
+        if t.as_tuple().exponent > 0:
+            # 例如 "10" normalize 后是 1E+1，转回整数形式
+            t = t.quantize(Decimal(1))
+        digits = -t.as_tuple().exponent
+        scale = 10 ** digits
+        return _TickSpec(dec=t, scale=scale, units=int(t * scale), digits=digits)
+
+    def _get_tick_size(self, symbol: str) -> Optional[_TickSpec]:
         """
         读取 PRICE_FILTER tickSize，用于触发价舍入。
         """
         self._refresh_exchange_info_if_needed()
-        assert self._exchange_info is not None
-        for s in self._exchange_info.get("symbols", []):
-            if s.get("symbol") != symbol:
-                continue
-            for f in s.get("filters", []):
-                if f.get("filterType") == "PRICE_FILTER":
-                    try:
-                        return float(f.get("tickSize"))
-                    except Exception:
-                        return None
-        return None
+        entry = self._symbol_index.get(symbol)
+        if entry is None:
+            return None
+        return entry["tick"]
 
     @staticmethod
-    def _round_to_tick_str(price: float, tick: float) -> str:
+    def _round_to_tick_str(price: float, tick: Optional[_TickSpec]) -> str:
         """
         按 tickSize 向下截断，并输出符合精度的十进制字符串，避免 float 尾差导致 -1111。
         """
-        if not tick or tick <= 0:
+        if tick is None:
             # 兜底：转成普通字符串
             return format(Decimal(str(price)), "f")
 
+        s = repr(price)
+        if s[0].isdigit() and "e" not in s and "n" not in s:
+            # 整数路径：直接从 repr 的十进制字符串取出按 tick 缩放后的整数（与 Decimal(str(price)) 完全一致，
+            # 没有 float 乘法误差），再向下取整到 tick 的整数倍
+            int_part, _, frac = s.partition(".")
+            p_units = int(int_part + frac[:tick.digits].ljust(tick.digits, "0"))
+            rounded = p_units - p_units % tick.units
+            if not tick.digits:
+                return str(rounded)
+            q, r = divmod(rounded, tick.scale)
+            return f"{q}.{r:0{tick.digits}d}"
+
         p = Decimal(str(price))
-        t = Decimal(str(tick))
 
         # 向下取整到 tick 的整数倍
-        multiple = (p / t).to_integral_value(rounding=ROUND_DOWN)
-        rounded = multiple * t
+        multiple = (p / tick.dec).to_integral_value(rounding=ROUND_DOWN)
+        rounded = multiple * tick.dec
 
         # 按 tick 的小数位 quantize（例如 tick=0.001 => 保留 3 位）
-        rounded = rounded.quantize(t, rounding=ROUND_DOWN)
+        rounded = rounded.quantize(tick.dec, rounding=ROUND_DOWN)
 
         # 转成非科学计数法字符串
         return format(rounded, "f")
@@ -211,8 +329,11 @@ class BinanceFuturesTrader:
 
             # 注意：合约触发单通常要设置 workingType（MARK_PRICE/CONTRACT_PRICE）
             # 这里用 MARK_PRICE 更稳
+            # TP / SL 互不依赖，丢线程池并发下单，耗时从 2 个 RTT 变成 1 个；一边失败不影响另一边
+            futs = {}
             if tp_price and tp_price > 0:
-                results["tp"] = self._futures_algo_order(
+                futs["tp"] = self._pool.submit(
+                    self._futures_algo_order,
                     algoType="CONDITIONAL",
                     symbol=symbol,
                     side="BUY",
@@ -221,11 +342,11 @@ class BinanceFuturesTrader:
                     closePosition="true",
                     workingType="MARK_PRICE",
                     positionSide="SHORT",   # One-way 模式删掉这一行
-                    recvWindow=self.recv_window,
                 )
 
             if sl_price and sl_price > 0:
-                results["sl"] = self._futures_algo_order(
+                futs["sl"] = self._pool.submit(
+                    self._futures_algo_order,
                     algoType="CONDITIONAL",
                     symbol=symbol,
                     side="BUY",
@@ -234,9 +355,14 @@ class BinanceFuturesTrader:
                     closePosition="true",
                     workingType="MARK_PRICE",
                     positionSide="SHORT",   # One-way 模式删掉这一行
-                    recvWindow=self.recv_window,
                 )
 
+            for k, fut in futs.items():
+                try:
+                    results[k] = fut.result()
+                except Exception as e:
+                    log.error("place_tp_sl_for_short %s failed: %s", k, e, exc_info=True)
+
             return results
 
         except (BinanceRequestException, BinanceAPIException) as e:
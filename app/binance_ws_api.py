@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import orjson
+from websockets.sync.client import ClientConnection, connect
+
+log = logging.getLogger("binance_ws_api")
+
+WS_FAPI_URL = "wss://ws-fapi.binance.com/ws-fapi/v1"
+WS_FAPI_TESTNET_URL = "wss://testnet.binancefuture.com/ws-fapi/v1"
+
+
+class BinanceWsApiError(Exception):
+    """请求已发出，但被交易所拒绝 / 没等到响应。不能再走 REST 重发（可能重复下单）。"""
+
+    def __init__(self, code: Optional[int], message: str) -> None:
+        super().__init__(f"code={code} msg={message}")
+        self.code = code
+        self.message = message
+
+
+class BinanceWsApiUnavailable(Exception):
+    """连接不可用，请求没有发出去，调用方可以安全回退到 REST。"""
+
+
+class BinanceWsApiClient:
+    """Binance USD-M Futures WebSocket API（/ws-fapi/v1）同步客户端。
+
+    一条长连接复用所有请求（省掉每单的 TCP/TLS 握手），后台线程按 id 把响应分发给等待方。
+    签名方式与 REST 相同（HMAC-SHA256，参数按字母序）。
+    建连/重连只在后台线程里做（指数退避）；下单路径从不建连，没有连接时立即抛 BinanceWsApiUnavailable 让调用方走 REST。
+    """
+
+    RECONNECT_BACKOFF_MIN = 1.0
+    RECONNECT_BACKOFF_MAX = 30.0
+
+    def __init__(self, api_key: str, api_secret: str, testnet: bool, recv_window: int, timeout_sec: float = 5.0) -> None:
+        self.url = WS_FAPI_TESTNET_URL if testnet else WS_FAPI_URL
+        self.api_key = api_key
+        self._secret = api_secret.encode()
+        self.recv_window = recv_window
+        self.timeout_sec = timeout_sec
+
+        # (连接, 该连接上等待响应的请求)；断线时只让这条连接上的请求失败
+        self._conn: Optional[Tuple[ClientConnection, Dict[str, Future]]] = None
+        self._conn_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._connecting = False
+        self._closed = threading.Event()
+
+    def connect(self) -> None:
+        """非阻塞：启动后台建连线程（已在建连/已连接时什么也不做）。"""
+        with self._conn_lock:
+            if self._closed.is_set() or self._connecting or self._conn is not None:
+                return
+            self._connecting = True
+        threading.Thread(target=self._connect_loop, name="binance-ws-api-connect", daemon=True).start()
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._conn_lock:
+            cur, self._conn = self._conn, None
+        if cur is not None:
+            cur[0].close()
+
+    def _connect_loop(self) -> None:
+        backoff = self.RECONNECT_BACKOFF_MIN
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn = connect(self.url, open_timeout=self.timeout_sec, compression=None)
+                except Exception as e:
+                    log.info("ws api connect failed, retry in %.0fs: %r", backoff, e)
+                    # Event.wait：close() 时立即醒来退出
+                    self._closed.wait(backoff)
+                    backoff = min(backoff * 2, self.RECONNECT_BACKOFF_MAX)
+                    continue
+
+                with self._conn_lock:
+                    if self._closed.is_set():
+                        conn.close()
+                        return
+                    self._conn = (conn, {})
+                    threading.Thread(
+                        target=self._reader, args=(self._conn,), name="binance-ws-api", daemon=True
+                    ).start()
+                log.info("ws api connected: %s", self.url)
+                return
+        finally:
+            with self._conn_lock:
+                self._connecting = False
+
+    def _reader(self, cur: Tuple[ClientConnection, Dict[str, Future]]) -> None:
+        conn, pending = cur
+        try:
+            for raw in conn:
+                try:
+                    data = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    continue
+                fut = pending.pop(str(data.get("id")), None)
+                if fut is not None and not fut.done():
+                    fut.set_result(data)
+        except Exception as e:
+            log.info("ws api connection closed: %s", e)
+        finally:
+            with self._conn_lock:
+                if self._conn is cur:
+                    self._conn = None
+            for fut in list(pending.values()):
+                if not fut.done():
+                    fut.set_exception(BinanceWsApiError(None, "connection closed before response"))
+            pending.clear()
+            # 断线后在后台重连，期间下单直接走 REST
+            self.connect()
+
+    def _sign(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        # float 统一转成字符串：签名串与发出去的 JSON 取值一致
+        signed = {
+            **{k: (repr(v) if isinstance(v, float) else v) for k, v in params.items()},
+            "apiKey": self.api_key,
+            "recvWindow": self.recv_window,
+            "timestamp": int(time.time() * 1000),
+        }
+        signed = dict(sorted(signed.items()))
+        signed["signature"] = hmac.new(self._secret, urlencode(signed).encode(), hashlib.sha256).hexdigest()
+        return signed
+
+    def request(self, method: str, params: Dict[str, Any]) -> Any:
+        cur = self._conn
+        if cur is None:
+            # 不在下单路径上建连（可能卡住 open_timeout），直接让调用方回退 REST
+            self.connect()
+            raise BinanceWsApiUnavailable("not connected")
+        conn, pending = cur
+        rid = str(next(self._ids))
+        fut: Future = Future()
+        pending[rid] = fut
+        frame = orjson.dumps({"id": rid, "method": method, "params": self._sign(params)}).decode()
+        try:
+            try:
+                conn.send(frame)
+            except Exception as e:
+                # 连接已坏：关闭它，reader 退出时会触发后台重连
+                conn.close()
+                raise BinanceWsApiUnavailable(repr(e)) from e
+            try:
+                data = fut.result(timeout=self.timeout_sec)
+            except FutureTimeoutError:
+                raise BinanceWsApiError(None, f"{method} timeout after {self.timeout_sec}s")
+        finally:
+            pending.pop(rid, None)
+
+        if data.get("status") != 200:
+            err = data.get("error") or {}
+            raise BinanceWsApiError(err.get("code"), str(err.get("msg")))
+        return data.get("result")
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 from dataclasses import dataclass
-from typing import AsyncIterator, Optional
+from typing import AsyncIterator, List, Optional, Union
 
+import orjson
 import websockets
 
 from .utils import norm_addr, pad_topic_address
@@ -14,6 +14,13 @@ log = logging.getLogger("bsc_ws_listener")
 
 TRANSFER_TOPIC0 = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
 
+# 订阅推送的 method 字段；其它帧（心跳/别的订阅/RPC 响应）不含该标记
+SUBSCRIPTION_MARKER = "eth_subscription"
+
+# websockets 内部最多缓冲的帧数；解析后的事件进入有界队列，两者都满时靠 TCP 流控反压
+WS_MAX_QUEUE = 16
+EVENT_QUEUE_SIZE = 256
+
 
 @dataclass
 class ERC20TransferIn:
@@ -36,19 +43,66 @@ class BscWsListener:
         self.watch_address = norm_addr(watch_address)
         self.watch_topic = pad_topic_address(self.watch_address)
 
+        # 40 位小写 hex 地址尾部：用于 JSON 前的子串预过滤和 to 地址比较（节点返回的 topic 是小写 hex）
+        self._watch_topic_str = self.watch_topic[-40:]
+        self._watch_topic_bytes = self._watch_topic_str.encode()
+        self._marker_bytes = SUBSCRIPTION_MARKER.encode()
+
+        # 订阅请求内容固定，构造时序列化一次，重连时直接发送。
+        # 保持 str：websockets 的 str 会以 text frame 发送，节点只接受 text frame
+        self._sub_frame = orjson.dumps(
+            {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "eth_subscribe",
+                "params": [
+                    "logs",
+                    {
+                        "topics": [
+                            TRANSFER_TOPIC0,
+                            None,
+                            self.watch_topic,
+                        ]
+                    },
+                ],
+            }
+        ).decode()
+
     async def listen(self) -> AsyncIterator[ERC20TransferIn]:
+        async for batch in self.listen_batches():
+            for evt in batch:
+                yield evt
+
+    async def listen_batches(self, max_batch: int = 256) -> AsyncIterator[List[ERC20TransferIn]]:
+        """
+        每次 yield 当前已解析好的一批事件（最多 max_batch 条），mint 风暴时下游可以一次性并发处理。
+
+        网络读取在独立的 reader 任务里完成（预过滤 + 解析后放入有界队列），与下游消费速度解耦；
+        队列满时 reader 暂停读取，由 websockets 的小缓冲 + TCP 流控把压力推回节点，内存有上限。
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+        task = asyncio.create_task(self._run(queue))
+        try:
+            while True:
+                batch = [await queue.get()]
+                while len(batch) < max_batch:
+                    try:
+                        batch.append(queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                yield batch
+        finally:
+            task.cancel()
+
+    async def _run(self, queue: asyncio.Queue) -> None:
         backoff = 0.2
         while True:
             try:
-                async with websockets.connect(self.ws_url, ping_interval=20, ping_timeout=20, max_queue=1024) as ws:
+                async with websockets.connect(self.ws_url, ping_interval=20, ping_timeout=20, max_queue=WS_MAX_QUEUE) as ws:
                     backoff = 0.2
                     sub_id = await self._subscribe_logs(ws)
                     log.info("subscribed: %s", sub_id)
-
-                    async for msg in ws:
-                        evt = self._parse_message(msg)
-                        if evt:
-                            yield evt
+                    await self._reader(ws, queue)
 
             except asyncio.CancelledError:
                 raise
@@ -57,32 +111,33 @@ class BscWsListener:
                 await asyncio.sleep(min(backoff, 3.0))
                 backoff = min(backoff * 2, 3.0)
 
+    async def _reader(self, ws, queue: asyncio.Queue) -> None:
+        async for msg in ws:
+            if not self._is_candidate(msg):
+                continue
+            evt = self._parse_message(msg)
+            if evt:
+                await queue.put(evt)
+
     async def _subscribe_logs(self, ws) -> str:
-        req = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "eth_subscribe",
-            "params": [
-                "logs",
-                {
-                    "topics": [
-                        TRANSFER_TOPIC0,
-                        None,
-                        self.watch_topic,
-                    ]
-                },
-            ],
-        }
-        await ws.send(json.dumps(req))
+        await ws.send(self._sub_frame)
         raw = await asyncio.wait_for(ws.recv(), timeout=5)
-        data = json.loads(raw)
+        data = orjson.loads(raw)
         if "result" not in data:
             raise RuntimeError(f"subscribe failed: {data}")
         return data["result"]
 
-    def _parse_message(self, msg: str) -> Optional[ERC20TransferIn]:
+    def _is_candidate(self, msg: Union[str, bytes]) -> bool:
+        if isinstance(msg, bytes):
+            return self._marker_bytes in msg and self._watch_topic_bytes in msg
+        return SUBSCRIPTION_MARKER in msg and self._watch_topic_str in msg
+
+    def _parse_message(self, msg: Union[str, bytes]) -> Optional[ERC20TransferIn]:
         try:
-            data = json.loads(msg)
+            try:
+                data = orjson.loads(msg)
+            except orjson.JSONDecodeError:
+                return None
             params = data.get("params", {})
             result = params.get("result")
             if not result:
@@ -92,15 +147,15 @@ class BscWsListener:
             if len(topics) < 3:
                 return None
 
-            token_contract = norm_addr(result["address"])
-            from_addr = "0x" + topics[1][-40:]
-            to_addr = "0x" + topics[2][-40:]
-            from_addr = norm_addr(from_addr)
-            to_addr = norm_addr(to_addr)
-
-            if to_addr != self.watch_address:
+            # 先比较 to 的 40 位尾部（endswith 不产生切片），不匹配就不做 checksum 计算。
+            # 与 _is_candidate 的预过滤规则一致：节点返回的 topic 是小写 hex
+            if not topics[2].endswith(self._watch_topic_str):
                 return None
 
+            token_contract = norm_addr(result["address"])
+            from_addr = norm_addr("0x" + topics[1][-40:])
+            to_addr = self.watch_address
+
             amount_raw = int(result.get("data", "0x0"), 16)
             tx_hash = result.get("transactionHash")
             block_number = int(result.get("blockNumber", "0x0"), 16)
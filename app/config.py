@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import functools
+import os
 from dataclasses import dataclass
 from typing import Any, Dict
 import yaml
 
+try:
+    # libyaml 的 C 实现；未编译 libyaml 时回退纯 Python 版
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     # RPC provider endpoints (single provider only)
     rpc_provider: str
@@ -18,6 +26,7 @@ class Settings:
     binance_api_secret: str
     binance_testnet: bool
     binance_recv_window: int
+    binance_ws_api: bool
 
     trigger_value_usdt: float
     short_notional_usdt: float
@@ -36,8 +45,14 @@ class Settings:
 
 
 def load_settings(path: str) -> Settings:
+    # 按 (绝对路径, mtime) 缓存：文件没改就直接复用已校验的 Settings（frozen，可安全共享）
+    return _load_settings_cached(os.path.abspath(path), os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_settings_cached(path: str, mtime: float) -> Settings:
     with open(path, "r", encoding="utf-8") as f:
-        raw: Dict[str, Any] = yaml.safe_load(f)
+        raw: Dict[str, Any] = yaml.load(f, Loader=_SafeLoader)
 
     # Backward compatibility:
     # - legacy config uses `alchemy.ws_url` and `alchemy.watch_address`
@@ -125,6 +140,7 @@ def load_settings(path: str) -> Settings:
         binance_api_secret=raw["binance"]["api_secret"],
         binance_testnet=bool(raw["binance"].get("testnet", False)),
         binance_recv_window=int(raw["binance"].get("recv_window", 5000)),
+        binance_ws_api=bool(raw["binance"].get("ws_api", False)),
 
         trigger_value_usdt=float(raw["risk"]["trigger_value_usdt"]),
         short_notional_usdt=float(raw["risk"]["short_notional_usdt"]),
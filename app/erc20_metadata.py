@@ -3,11 +3,14 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
-import aiohttp
-from eth_utils import to_checksum_address
+import httpx
+import orjson
+
+from .utils import norm_addr
 
 log = logging.getLogger("erc20_metadata")
 
@@ -19,144 +22,187 @@ SYMBOL_CALLDATA = "0x95d89b41"
 class TokenMeta:
     symbol: str
     decimals: int
-    ts: float
+
+
+class _LRUTTL:
+    """
+    有上限的 LRU + TTL 缓存：命中时移到队尾，超过 maxsize 淘汰最久未用的，过期在读取时惰性清理。
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        ts, value = item
+        if time.monotonic() - ts > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
 
 
 class ERC20MetadataClient:
-    def __init__(self, rpc_http_url: str, cache_ttl_sec: int = 24 * 3600) -> None:
+    def __init__(self, rpc_http_url: str, cache_ttl_sec: int = 24 * 3600, cache_maxsize: int = 50_000) -> None:
         self.rpc_http_url = rpc_http_url
         self.cache_ttl_sec = cache_ttl_sec
 
-        self._cache: Dict[str, TokenMeta] = {}
+        self._cache = _LRUTTL(maxsize=cache_maxsize, ttl=cache_ttl_sec)
         self._inflight: Dict[str, asyncio.Future] = {}
-        self._lock = asyncio.Lock()
+        # 长连接复用：RPC 只有一个 host，HTTP/2 在同一条 TCP/TLS 连接上多路复用并发请求
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # 无 await，单事件循环下天然原子，不需要锁
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32, keepalive_expiry=75),
+            )
+        return self._client
 
-    @staticmethod
-    def _now() -> float:
-        return time.monotonic()
+    async def close(self) -> None:
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
 
-    def _cache_get(self, contract: str) -> Optional[TokenMeta]:
-        key = contract.lower()
-        meta = self._cache.get(key)
-        if not meta:
-            return None
-        if self._now() - meta.ts > self.cache_ttl_sec:
-            self._cache.pop(key, None)
-            return None
-        return meta
+    def _cache_get_key(self, key: str) -> Optional[TokenMeta]:
+        """key 为小写合约地址。"""
+        return self._cache.get(key)
 
-    def _cache_set(self, contract: str, symbol: str, decimals: int) -> TokenMeta:
-        meta = TokenMeta(symbol=symbol.upper(), decimals=int(decimals), ts=self._now())
-        self._cache[contract.lower()] = meta
+    def _cache_set_key(self, key: str, symbol: str, decimals: int) -> TokenMeta:
+        meta = TokenMeta(symbol=symbol.upper(), decimals=int(decimals))
+        self._cache.set(key, meta)
         return meta
 
     async def get_symbol_decimals(self, token_contract: str, timeout_sec: float = 1.0) -> Optional[Tuple[str, int]]:
-        token_contract = to_checksum_address(token_contract)
-        cached = self._cache_get(token_contract)
+        # checksum 地址用于 RPC，小写 key 用于缓存/inflight；各只算一次
+        token_contract = norm_addr(token_contract)
+        key = token_contract.lower()
+        cached = self._cache_get_key(key)
         if cached:
             return cached.symbol, cached.decimals
 
-        key = token_contract.lower()
-        async with self._lock:
-            cached2 = self._cache_get(token_contract)
-            if cached2:
-                return cached2.symbol, cached2.decimals
-
-            fut = self._inflight.get(key)
-            if fut is None:
-                loop = asyncio.get_running_loop()
-                fut = loop.create_future()
-                self._inflight[key] = fut
-                do_fetch = True
-            else:
-                do_fetch = False
-
-        if not do_fetch:
+        # 从上面的缓存检查到登记 inflight 之间没有 await，单事件循环下天然原子，不需要 asyncio.Lock
+        fut = self._inflight.get(key)
+        if fut is not None:
             try:
-                return await asyncio.wait_for(fut, timeout=timeout_sec)
+                # shield：某个等待方超时不能把共享的 future 取消掉
+                return await asyncio.wait_for(asyncio.shield(fut), timeout=timeout_sec)
             except Exception:
                 return None
 
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+
         try:
-            # 并发请求 symbol/decimals，降低首次延迟
-            symbol_res, decimals_res = await asyncio.gather(
-                self._eth_call_symbol(token_contract, timeout_sec=timeout_sec),
-                self._eth_call_decimals(token_contract, timeout_sec=timeout_sec),
-                return_exceptions=True,
+            # symbol/decimals 合并成一次 JSON-RPC 批量请求，一个 RTT 拿到两个结果
+            symbol_raw, decimals_raw = await self._rpc_batch(
+                [
+                    ("eth_call", self._eth_call_params(token_contract, SYMBOL_CALLDATA)),
+                    ("eth_call", self._eth_call_params(token_contract, DECIMALS_CALLDATA)),
+                ],
+                timeout_sec=timeout_sec,
             )
 
-            symbol = None if isinstance(symbol_res, Exception) else symbol_res
-            decimals = None if isinstance(decimals_res, Exception) else decimals_res
+            symbol = _decode_symbol(symbol_raw)
+            decimals = _decode_decimals(decimals_raw)
 
             if not symbol or decimals is None:
                 raise RuntimeError("metadata incomplete")
 
-            meta = self._cache_set(token_contract, symbol, decimals)
+            meta = self._cache_set_key(key, symbol, decimals)
 
-            async with self._lock:
-                f = self._inflight.pop(key, None)
-                if f and not f.done():
-                    f.set_result((meta.symbol, meta.decimals))
+            f = self._inflight.pop(key, None)
+            if f and not f.done():
+                f.set_result((meta.symbol, meta.decimals))
             return meta.symbol, meta.decimals
 
         except Exception as e:
             log.info("metadata fetch failed token=%s err=%s", token_contract, e)
-            async with self._lock:
-                f = self._inflight.pop(key, None)
-                if f and not f.done():
-                    f.set_result(None)
+            f = self._inflight.pop(key, None)
+            if f and not f.done():
+                f.set_result(None)
             return None
 
-    async def _rpc(self, method: str, params: list, timeout_sec: float) -> dict:
-        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
-        timeout = aiohttp.ClientTimeout(total=timeout_sec)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(self.rpc_http_url, json=payload) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-                if "error" in data:
-                    raise RuntimeError(data["error"])
-                return data
-
-    async def _eth_call(self, to_addr: str, data: str, timeout_sec: float) -> str:
-        res = await self._rpc(
-            "eth_call",
-            [{"to": to_checksum_address(to_addr), "data": data}, "latest"],
-            timeout_sec=timeout_sec,
+    async def _rpc_batch(self, calls: List[Tuple[str, list]], timeout_sec: float) -> List[Optional[Any]]:
+        """
+        JSON-RPC 批量请求：多个调用合并成一次 POST，按 id 对齐返回 result（单个调用出错对应位置为 None）。
+        """
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        # httpx 的 timeout 是分阶段的（connect/write/read/pool 各算一次），用 wait_for 限制整次调用的总耗时
+        r = await asyncio.wait_for(
+            self._get_client().post(
+                self.rpc_http_url,
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=timeout_sec,
+            ),
+            timeout=timeout_sec,
         )
-        return res.get("result", "0x")
+        r.raise_for_status()
+        data = orjson.loads(r.content)
+        if not isinstance(data, list):
+            # 节点不支持批量 / 整体报错时返回单个对象
+            raise RuntimeError(data.get("error") if isinstance(data, dict) else data)
+
+        results: List[Optional[Any]] = [None] * len(calls)
+        for item in data:
+            i = item.get("id")
+            if isinstance(i, int) and 0 <= i < len(calls) and "error" not in item:
+                results[i] = item.get("result")
+        return results
 
-    async def _eth_call_decimals(self, token_contract: str, timeout_sec: float) -> Optional[int]:
-        raw = await self._eth_call(token_contract, DECIMALS_CALLDATA, timeout_sec=timeout_sec)
-        if not raw or raw == "0x":
-            return None
-        try:
-            return int(raw, 16)
-        except Exception:
-            return None
+    @staticmethod
+    def _eth_call_params(to_addr: str, data: str) -> list:
+        # to_addr 已由调用方 checksum 过
+        return [{"to": to_addr, "data": data}, "latest"]
 
-    async def _eth_call_symbol(self, token_contract: str, timeout_sec: float) -> Optional[str]:
-        raw = await self._eth_call(token_contract, SYMBOL_CALLDATA, timeout_sec=timeout_sec)
-        if not raw or raw == "0x":
-            return None
 
-        h = raw[2:]
-        try:
-            b = bytes.fromhex(h)
-        except Exception:
-            return None
+def _decode_decimals(raw: Optional[str]) -> Optional[int]:
+    if not raw or raw == "0x":
+        return None
+    try:
+        return int(raw, 16)
+    except Exception:
+        return None
 
-        if len(b) == 32:
-            s = b.rstrip(b"\x00").decode("utf-8", errors="ignore").strip()
-            return s or None
 
-        if len(b) >= 96:
-            try:
-                strlen = int.from_bytes(b[32:64], "big")
-                sbytes = b[64:64 + strlen]
-                s = sbytes.decode("utf-8", errors="ignore").strip()
-                return s or None
-            except Exception:
-                return None
+def _decode_symbol(raw: Optional[str]) -> Optional[str]:
+    if not raw or raw == "0x":
+        return None
 
+    try:
+        b = bytes.fromhex(raw[2:])
+    except Exception:
         return None
+
+    n = len(b)
+    # 老式 bytes32 symbol 最常见，先走快路径
+    if n == 32:
+        return b.rstrip(b"\x00").decode("utf-8", errors="ignore").strip() or None
+
+    if n >= 96:
+        # ABI string：offset(32) + length(32) + data；memoryview 切片不拷贝
+        mv = memoryview(b)
+        strlen = int.from_bytes(mv[32:64], "big")
+        if 64 + strlen <= n:
+            return str(mv[64:64 + strlen], "utf-8", "ignore").strip() or None
+
+    return None
@@ -1,8 +1,39 @@
+import atexit
 import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 
 def setup_logging(level: str = "INFO") -> None:
-    logging.basicConfig(
-        level=getattr(logging, level.upper(), logging.INFO),
-        format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    )
+    global _listener
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s"))
+
+    # 业务线程只把 record 放进队列，真正的 IO（stdout/文件）由 QueueListener 的后台线程完成，
+    # 不阻塞事件循环
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root.handlers[:] = [logging.handlers.QueueHandler(q)]
+
+    _stop_listener()
+    _listener = logging.handlers.QueueListener(q, handler, respect_handler_level=True)
+    _listener.start()
+
+    # 生产环境：日志 handler 自身出错时不打印 traceback 到 stderr
+    logging.raiseExceptions = False
+
+
+# 退出时停止当前 listener，把队列里剩余的日志刷完（只注册一次，重复 setup_logging 不会重复 stop）
+atexit.register(_stop_listener)
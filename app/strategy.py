@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from collections import OrderedDict
 
 from .token_registry import BinanceTokenRegistry
 from .binance_futures import BinanceFuturesTrader
@@ -10,6 +11,20 @@ from .erc20_metadata import ERC20MetadataClient
 
 log = logging.getLogger("strategy")
 
+# 10**decimals 查表（decimals 已校验在 0..36）
+_POW10 = tuple(10 ** i for i in range(37))
+
+_SHORT_OPENED_BANNER = (
+    "\n"
+    "********************************************************************\n"
+    "********************  SHORT OPENED (TRADE)  ************************\n"
+    "********************************************************************\n"
+    "* symbol  : %-52s *\n"
+    "* orderId : %-52s *\n"
+    "* tx      : %-52s *\n"
+    "********************************************************************"
+)
+
 
 class Strategy:
     def __init__(
@@ -38,24 +53,34 @@ class Strategy:
         self.take_profit_pct = float(take_profit_pct or 0.0)
         self.stop_loss_pct = float(stop_loss_pct or 0.0)
 
-        self._seen_txs = set()
-        self._seen_lock = asyncio.Lock()
+        # 滑动窗口去重（LRU）：超过上限只淘汰最旧的 tx，不会整体 clear 导致旧 tx 被当成新事件重复处理
+        self._seen_txs: "OrderedDict[str, None]" = OrderedDict()
+        self._seen_cap = 50_000
 
-    async def _dedup_tx(self, tx_hash: str) -> bool:
-        async with self._seen_lock:
-            if tx_hash in self._seen_txs:
-                return False
-            self._seen_txs.add(tx_hash)
-            if len(self._seen_txs) > 50000:
-                self._seen_txs.clear()
-            return True
+    def _dedup_tx(self, tx_hash: str) -> bool:
+        # 同步方法、无 await：在单事件循环里天然原子，不需要 asyncio.Lock
+        if tx_hash in self._seen_txs:
+            self._seen_txs.move_to_end(tx_hash)
+            return False
+        self._seen_txs[tx_hash] = None
+        if len(self._seen_txs) > self._seen_cap:
+            self._seen_txs.popitem(last=False)
+        return True
 
     async def on_transfer_in(self, evt: ERC20TransferIn) -> None:
         try:
-            if evt.tx_hash and not await self._dedup_tx(evt.tx_hash):
+            if evt.tx_hash and not self._dedup_tx(evt.tx_hash):
                 return
 
-            sd = await self.meta.get_symbol_decimals(evt.token_contract, timeout_sec=1.0)
+            # token list 刷新与 metadata 查询互不依赖，先并发启动刷新（缓存有效时立即完成）
+            refresh_task = asyncio.create_task(self.registry.refresh_if_needed())
+            try:
+                sd = await self.meta.get_symbol_decimals(evt.token_contract, timeout_sec=1.0)
+            finally:
+                # 无论是否提前返回都 await，保证 task 有引用且异常被取走
+                # （stale-while-revalidate 下只有冷启动时才真正需要等待）
+                await refresh_task
+
             if not sd:
                 log.info("metadata unavailable, skip safely. token=%s tx=%s", evt.token_contract, evt.tx_hash)
                 return
@@ -65,16 +90,19 @@ class Strategy:
                 log.info("weird decimals=%s, skip. symbol=%s token=%s", decimals, symbol, evt.token_contract)
                 return
 
-            amount = evt.amount_raw / (10 ** decimals)
+            amount = evt.amount_raw / _POW10[decimals]
 
-            info = await self.registry.get_token_info(symbol)
+            info = self.registry.lookup(symbol)
             in_list = info is not None
             price = self.registry.extract_price_usdt(info) if info else None
 
+            # 同一事件只查一次合约是否存在、最多取一次 mark price（价格兜底与 TP/SL entry 共用）
             futures_symbol = f"{symbol}USDT"
-            if price is None:
-                if self.trader.futures_symbol_exists(futures_symbol):
-                    price = self.trader.get_mark_price(futures_symbol)
+            exists = self.trader.futures_symbol_exists(futures_symbol)
+            mark = None
+            if price is None and exists:
+                mark = self.trader.get_mark_price(futures_symbol)
+                price = mark
 
             if price is None:
                 log.info("price unavailable, skip. symbol=%s in_list=%s tx=%s", symbol, in_list, evt.tx_hash)
@@ -93,7 +121,7 @@ class Strategy:
             if value_usdt < self.trigger_value_usdt:
                 return
 
-            if not self.trader.futures_symbol_exists(futures_symbol):
+            if not exists:
                 log.info("triggered but no futures market: %s tx=%s", futures_symbol, evt.tx_hash)
                 return
 
@@ -105,24 +133,13 @@ class Strategy:
             )
 
             if order:
-                log.warning(
-                    "\n"
-                    "********************************************************************\n"
-                    "********************  SHORT OPENED (TRADE)  ************************\n"
-                    "********************************************************************\n"
-                    "* symbol  : %-52s *\n"
-                    "* orderId : %-52s *\n"
-                    "* tx      : %-52s *\n"
-                    "********************************************************************",
-                    futures_symbol,
-                    str(order.get("orderId")),
-                    evt.tx_hash,
-                )
+                if log.isEnabledFor(logging.WARNING):
+                    log.warning(_SHORT_OPENED_BANNER, futures_symbol, str(order.get("orderId")), evt.tx_hash)
 
                 # 止盈止损开始
                 if self.take_profit_pct > 0 or self.stop_loss_pct > 0:
-                    # 取一个近似 entry：用 mark price（简单稳）
-                    entry_price = self.trader.get_mark_price(futures_symbol)
+                    # 取一个近似 entry：用 mark price（简单稳），前面已取过就直接复用
+                    entry_price = mark if mark is not None else self.trader.get_mark_price(futures_symbol)
                     if entry_price and entry_price > 0:
                         res = self.trader.place_tp_sl_for_short(
                             symbol=futures_symbol,
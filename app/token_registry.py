@@ -6,6 +6,7 @@ import time
 from typing import Any, Dict, Optional
 
 import aiohttp
+import orjson
 
 from .utils import RateLimiter
 
@@ -21,14 +22,36 @@ class BinanceTokenRegistry:
         self._lock = asyncio.Lock()
         self._last_fetch = 0.0
         self._cached: Dict[str, Dict[str, Any]] = {}
+        self._refreshing = False
+        # 持有后台刷新任务的引用，避免被 GC 回收
+        self._refresh_task: Optional[asyncio.Task] = None
+        # 长连接复用：避免每次刷新都重新 TCP+TLS 握手
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # 只在 _refresh 的 self._lock 内调用，无需再加锁
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=None),
+                # aiohttp 默认会自动解压；显式声明，确保响应走压缩
+                headers={"Accept-Encoding": "gzip, deflate"},
+                connector=aiohttp.TCPConnector(limit=8, keepalive_timeout=75, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     async def _fetch(self) -> Dict[str, Dict[str, Any]]:
         await self._limiter.acquire()
-        timeout = aiohttp.ClientTimeout(total=3)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(self._url) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
+        session = self._get_session()
+        async with session.get(self._url, timeout=aiohttp.ClientTimeout(total=3)) as resp:
+            resp.raise_for_status()
+            data = orjson.loads(await resp.read())
 
         tokens = data.get("data") or data.get("Data") or data
         out: Dict[str, Dict[str, Any]] = {}
@@ -49,13 +72,30 @@ class BinanceTokenRegistry:
         return out
 
     async def refresh_if_needed(self) -> None:
-        now = time.monotonic()
-        if now - self._last_fetch < self._cache_ttl and self._cached:
+        age = time.monotonic() - self._last_fetch
+        if self._cached and age < self._cache_ttl:
+            return
+
+        # stale-while-revalidate：刚过期时继续用旧数据，后台刷新，不阻塞当前事件；
+        # 只有冷启动（无缓存）或数据太旧时才同步等待刷新
+        if self._cached and age < self._cache_ttl * 2:
+            if not self._refreshing:
+                self._refreshing = True
+                self._refresh_task = asyncio.create_task(self._background_refresh())
             return
 
+        await self._refresh()
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self._refresh()
+        finally:
+            self._refreshing = False
+
+    async def _refresh(self) -> None:
         async with self._lock:
-            now2 = time.monotonic()
-            if now2 - self._last_fetch < self._cache_ttl and self._cached:
+            now = time.monotonic()
+            if now - self._last_fetch < self._cache_ttl and self._cached:
                 return
             try:
                 self._cached = await self._fetch()
@@ -66,6 +106,10 @@ class BinanceTokenRegistry:
 
     async def get_token_info(self, symbol_upper: str) -> Optional[Dict[str, Any]]:
         await self.refresh_if_needed()
+        return self.lookup(symbol_upper)
+
+    def lookup(self, symbol_upper: str) -> Optional[Dict[str, Any]]:
+        """只读当前缓存，不触发刷新（调用方自行保证已 refresh_if_needed）。"""
         return self._cached.get(symbol_upper.upper())
 
     @staticmethod
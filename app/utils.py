@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from eth_utils import to_checksum_address
 
 
-def norm_addr(a: str) -> str:
+@functools.lru_cache(maxsize=65536)
+def _cksum(a: str) -> str:
     return to_checksum_address(a)
 
 
+def norm_addr(a: str) -> str:
+    # checksum 要算一次 keccak256；按小写地址缓存，同一合约/地址只算一次
+    return _cksum(a.lower())
+
+
 def pad_topic_address(addr: str) -> str:
     addr = addr.lower().replace("0x", "")
     return "0x" + ("0" * 24) + addr
@@ -23,13 +30,22 @@ class RateLimiter:
 
     _tokens: float = 0
     _last: float = 0
-    _lock: asyncio.Lock = asyncio.Lock()
+    # default_factory：每个实例一把锁（类属性默认值会让所有实例共享同一把锁）
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
     def __post_init__(self) -> None:
         self._tokens = float(self.max_calls)
         self._last = time.monotonic()
 
     async def acquire(self) -> None:
+        # 快路径：令牌充足时直接扣减返回（无 await，单事件循环下原子），不走锁
+        now = time.monotonic()
+        tokens = min(self.max_calls, self._tokens + (now - self._last) * (self.max_calls / self.period))
+        if tokens >= 1:
+            self._tokens = tokens - 1
+            self._last = now
+            return
+
         async with self._lock:
             now = time.monotonic()
             elapsed = now - self._last
@@ -41,6 +57,9 @@ class RateLimiter:
                 self._tokens -= 1
                 return
 
+            # 一次算出需要等待的时间并预扣令牌：把 _last 推到 need 之后，后来者会自动排在后面，
+            # 睡醒后直接返回，不再递归重新抢锁
             need = (1 - self._tokens) * (self.period / self.max_calls)
-        await asyncio.sleep(max(need, 0.0))
-        await self.acquire()
+            self._tokens = 0.0
+            self._last = now + need
+        await asyncio.sleep(need)
@@ -1,6 +1,11 @@
 import asyncio
 import logging
 
+try:
+    import uvloop
+except ImportError:  # Windows 等没有 uvloop 的平台退回标准事件循环
+    uvloop = None
+
 from app.config import load_settings
 from app.logger import setup_logging
 from app.token_registry import BinanceTokenRegistry
@@ -8,6 +13,11 @@ from app.binance_futures import BinanceFuturesTrader
 from app.bsc_ws_listener import BscWsListener
 from app.strategy import Strategy
 from app.erc20_metadata import ERC20MetadataClient
+
+# 同时处理的事件上限：超出时暂停读取 listener，压力经有界队列 + TCP 流控推回节点
+MAX_CONCURRENT_EVENTS = 64
+
+
 async def main() -> None:
     st = load_settings("config.yaml")
     setup_logging(st.log_level)
@@ -24,6 +34,7 @@ async def main() -> None:
         api_secret=st.binance_api_secret,
         testnet=st.binance_testnet,
         recv_window=st.binance_recv_window,
+        ws_api=st.binance_ws_api,
     )
 
     listener = BscWsListener(st.rpc_ws_url, st.watch_address)
@@ -45,9 +56,30 @@ async def main() -> None:
 
     log.info("started. watching=%s", st.watch_address)
 
-    async for evt in listener.listen():
-        asyncio.create_task(strat.on_transfer_in(evt))
+    sem = asyncio.Semaphore(MAX_CONCURRENT_EVENTS)
+    # 持有 task 引用，避免运行中的 task 被 GC
+    tasks = set()
+
+    async def _run(evt) -> None:
+        try:
+            await strat.on_transfer_in(evt)
+        finally:
+            sem.release()
+
+    try:
+        async for batch in listener.listen_batches():
+            for evt in batch:
+                await sem.acquire()
+                t = asyncio.create_task(_run(evt))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+    finally:
+        await meta_client.close()
+        await registry.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
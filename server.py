@@ -2,13 +2,17 @@ import asyncio
 import json
 import os
 import signal
-import subprocess
 import time
 from dataclasses import dataclass
 from typing import Optional, Dict, Any
 
 from aiohttp import web
 
+try:
+    import uvloop
+except ImportError:  # Windows 等没有 uvloop 的平台退回标准事件循环
+    uvloop = None
+
 
 PID_FILE = "./bot_worker.pid"
 WORKER_CMD = ["python3", "main.py"]
@@ -26,20 +30,29 @@ def _pid_is_running(pid: int) -> bool:
         return True
 
 
-def _read_pidfile() -> Optional[int]:
+def _read_state() -> Optional[Dict[str, Any]]:
     if not os.path.exists(PID_FILE):
         return None
     try:
         with open(PID_FILE, "r", encoding="utf-8") as f:
-            pid = int(f.read().strip())
-        return pid
+            raw = f.read().strip()
+        data = json.loads(raw)
+        if isinstance(data, int):
+            # 兼容旧格式：文件里只有 pid
+            return {"pid": data}
+        if isinstance(data, dict):
+            return data
+        return None
     except Exception:
         return None
 
 
-def _write_pidfile(pid: int) -> None:
-    with open(PID_FILE, "w", encoding="utf-8") as f:
-        f.write(str(pid))
+def _write_state(state: Dict[str, Any]) -> None:
+    # 先写临时文件再 os.replace：原子替换，server 中途崩溃也不会留下半截文件
+    tmp = PID_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(state))
+    os.replace(tmp, PID_FILE)
 
 
 def _remove_pidfile() -> None:
@@ -61,23 +74,52 @@ class WorkerController:
     def __init__(self) -> None:
         self.state = WorkerState()
         self._lock = asyncio.Lock()
-
-        # 尝试从 pidfile 恢复状态
-        pid = _read_pidfile()
-        if pid and _pid_is_running(pid):
+        # 本进程启动的 worker：由事件循环在 SIGCHLD 时回收，returncode 即时可用
+        self._proc: Optional[asyncio.subprocess.Process] = None
+
+        # status() 结果短 TTL 缓存，避免监控轮询时每次都做 syscall；start/stop 内部总是绕过缓存重新计算
+        self._status_cache: Optional[Dict[str, Any]] = None
+        self._status_cache_ts = 0.0
+        self._status_ttl = 0.2
+
+        # 尝试从 pidfile（JSON 状态文件）恢复状态
+        saved = _read_state() or {}
+        pid = saved.get("pid")
+        if isinstance(pid, int) and pid > 0 and _pid_is_running(pid):
             self.state.pid = pid
-            # started_at 无法准确恢复（可选：写 metadata 文件）
+            self.state.started_at = saved.get("started_at")
         else:
             _remove_pidfile()
 
-    def status(self) -> Dict[str, Any]:
+    def _own_proc(self, pid: int) -> Optional[asyncio.subprocess.Process]:
+        if self._proc is not None and self._proc.pid == pid:
+            return self._proc
+        return None
+
+    def _is_alive(self, pid: int) -> bool:
+        proc = self._own_proc(pid)
+        if proc is None:
+            # 从 pidfile 恢复的进程不是本进程的子进程，只能探测
+            return _pid_is_running(pid)
+        if proc.returncode is None:
+            return True
+        # 已退出（事件循环已回收），记录退出码（被信号杀死时为 -signum）
+        self.state.last_exit_code = proc.returncode
+        self._proc = None
+        return False
+
+    def status(self, *, use_cache: bool = True) -> Dict[str, Any]:
+        now = time.monotonic()
+        if use_cache and self._status_cache is not None and now - self._status_cache_ts < self._status_ttl:
+            return self._status_cache
+
         pid = self.state.pid
-        running = bool(pid) and _pid_is_running(pid)
+        running = bool(pid) and self._is_alive(pid)
         if pid and not running:
             # pidfile 存在但进程没了
             self.state.pid = None
             _remove_pidfile()
-        return {
+        self._status_cache = {
             "ok": True,
             "running": running,
             "pid": pid if running else None,
@@ -87,38 +129,42 @@ class WorkerController:
             "pidfile": os.path.abspath(PID_FILE),
             "cmd": WORKER_CMD,
         }
+        self._status_cache_ts = now
+        return self._status_cache
 
     async def start(self, *, enable: bool = True) -> Dict[str, Any]:
         async with self._lock:
             if not enable:
-                return {"ok": True, **self.status(), "msg": "enable=false, not starting"}
+                return {"ok": True, **self.status(use_cache=False), "msg": "enable=false, not starting"}
 
-            st = self.status()
+            st = self.status(use_cache=False)
             if st["running"]:
                 return {"ok": True, **st, "msg": "already running"}
 
             try:
                 # 启动子进程：独立进程组，方便 stop 时杀整组（包含子进程）
-                p = subprocess.Popen(
-                    WORKER_CMD,
+                p = await asyncio.create_subprocess_exec(
+                    *WORKER_CMD,
                     cwd=WORKER_CWD,
                     stdout=None,  # 默认继承；也可改成文件
                     stderr=None,
-                    preexec_fn=os.setsid,  # 新进程组（Linux）
+                    start_new_session=True,  # 新会话/进程组（等价 setsid，但不需要 preexec_fn 回调）
+                    close_fds=True,
                 )
                 self.state.pid = p.pid
+                self._proc = p
                 self.state.started_at = time.time()
                 self.state.last_exit_code = None
                 self.state.last_error = None
-                _write_pidfile(p.pid)
-                return {"ok": True, **self.status(), "msg": "started"}
+                _write_state({"pid": p.pid, "started_at": self.state.started_at, "cmd": WORKER_CMD})
+                return {"ok": True, **self.status(use_cache=False), "msg": "started"}
             except Exception as e:
                 self.state.last_error = repr(e)
-                return {"ok": False, **self.status(), "msg": f"start failed: {e!r}"}
+                return {"ok": False, **self.status(use_cache=False), "msg": f"start failed: {e!r}"}
 
     async def stop(self, *, timeout_sec: float = 8.0) -> Dict[str, Any]:
         async with self._lock:
-            st = self.status()
+            st = self.status(use_cache=False)
             if not st["running"]:
                 return {"ok": True, **st, "msg": "already stopped"}
 
@@ -132,19 +178,30 @@ class WorkerController:
             except ProcessLookupError:
                 self.state.pid = None
                 _remove_pidfile()
-                return {"ok": True, **self.status(), "msg": "already exited"}
+                return {"ok": True, **self.status(use_cache=False), "msg": "already exited"}
             except Exception as e:
                 self.state.last_error = repr(e)
-                return {"ok": False, **self.status(), "msg": f"stop failed: {e!r}"}
-
-            # 等待退出
-            deadline = time.time() + timeout_sec
-            while time.time() < deadline:
-                if not _pid_is_running(pid):
+                return {"ok": False, **self.status(use_cache=False), "msg": f"stop failed: {e!r}"}
+
+            # 等待退出：自己的子进程直接 await wait()（SIGCHLD 唤醒，无轮询）；pidfile 恢复的进程只能轮询
+            proc = self._own_proc(pid)
+            if proc is not None:
+                try:
+                    await asyncio.wait_for(proc.wait(), timeout=timeout_sec)
+                    self._is_alive(pid)  # 记录退出码
                     self.state.pid = None
                     _remove_pidfile()
-                    return {"ok": True, **self.status(), "msg": "stopped (SIGTERM)"}
-                await asyncio.sleep(0.2)
+                    return {"ok": True, **self.status(use_cache=False), "msg": "stopped (SIGTERM)"}
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                deadline = time.time() + timeout_sec
+                while time.time() < deadline:
+                    if not self._is_alive(pid):
+                        self.state.pid = None
+                        _remove_pidfile()
+                        return {"ok": True, **self.status(use_cache=False), "msg": "stopped (SIGTERM)"}
+                    await asyncio.sleep(0.2)
 
             # 超时强杀
             try:
@@ -153,10 +210,14 @@ class WorkerController:
             except ProcessLookupError:
                 pass
 
-            await asyncio.sleep(0.2)
+            if proc is not None:
+                await proc.wait()
+                self._is_alive(pid)  # 记录退出码
+            else:
+                await asyncio.sleep(0.2)
             self.state.pid = None
             _remove_pidfile()
-            return {"ok": True, **self.status(), "msg": "killed (SIGKILL)"}
+            return {"ok": True, **self.status(use_cache=False), "msg": "killed (SIGKILL)"}
 
 
 # ---------- HTTP Handlers ----------
@@ -202,4 +263,5 @@ def create_app() -> web.Application:
 
 
 if __name__ == "__main__":
-    web.run_app(create_app(), host="0.0.0.0", port=9689)
+    loop = uvloop.new_event_loop() if uvloop is not None else None
+    web.run_app(create_app(), host="0.0.0.0", port=9689, loop=loop)